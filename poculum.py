@@ -1,4 +1,22 @@
+import array
+import gc
+import io
+import re
 import struct
+import sys
+
+# 预编译的 struct 格式，避免每次调用时重新解析格式字符串
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+_F32 = struct.Struct(">f")
+_F64 = struct.Struct(">d")
+# 类型字节与紧随其后的数据一次打包
+_TAG_U16 = struct.Struct(">BH")
+_TAG_U32 = struct.Struct(">BI")
+_TAG_F64 = struct.Struct(">Bd")
+
+# 容器的最大嵌套深度，防止循环引用或恶意数据导致无限展开
+_MAX_DEPTH = 100000
 
 
 def dump_poculum(obj):
@@ -24,342 +42,377 @@ def dump_poculum(obj):
         ValueError: 当数据超出支持的范围时
         TypeError: 当数据类型不支持时
     """
-    if obj is None:
-        return b""
+    out = bytearray()
+    _dump(obj, out)
+    return bytes(out)
 
-    # 处理布尔类型（必须在 int 之前检查，因为 bool 是 int 的子类）
-    elif isinstance(obj, bool):
-        if obj:
-            return b"\x01\x01"  # True -> uint8(1)
-        else:
-            return b"\x01\x00"  # False -> uint8(0)
-
-    # 处理整数类型
-    if isinstance(obj, int):
-        if obj >= 0:  # 无符号整数
-            if obj <= 255:  # uint8
-                return b"\x01" + obj.to_bytes(1, "big")
-            elif obj <= 65535:  # uint16
-                return b"\x02" + obj.to_bytes(2, "big")
-            elif obj <= 4294967295:  # uint32
-                return b"\x03" + obj.to_bytes(4, "big")
-            elif obj <= 18446744073709551615:  # uint64
-                return b"\x04" + obj.to_bytes(8, "big")
-            elif obj <= 340282366920938463463374607431768211455:  # uint128
-                return b"\x05" + obj.to_bytes(16, "big")
-            else:
-                raise ValueError("Integer too large for uint128")
-        else:  # 有符号整数
-            if -128 <= obj <= 127:  # int8
-                return b"\x11" + obj.to_bytes(1, "big", signed=True)
-            elif -32768 <= obj <= 32767:  # int16
-                return b"\x12" + obj.to_bytes(2, "big", signed=True)
-            elif -2147483648 <= obj <= 2147483647:  # int32
-                return b"\x13" + obj.to_bytes(4, "big", signed=True)
-            elif -9223372036854775808 <= obj <= 9223372036854775807:  # int64
-                return b"\x14" + obj.to_bytes(8, "big", signed=True)
-            elif (
-                -170141183460469231731687303715884105728
-                <= obj
-                <= 170141183460469231731687303715884105727
-            ):  # int128
-                return b"\x15" + obj.to_bytes(16, "big", signed=True)
+
+def dump_poculum_into(obj, writer):
+    """
+    将 Python 对象序列化后分块写入 writer
+
+    编码结果先写入内部缓冲区，每写下一个容器子项之前若缓冲区达到 64KB
+    就写出一次，缓冲区最多比 64KB 多出一个子项的编码结果，无需在内存中
+    保留完整的序列化结果。输出与 dump_poculum(obj) 完全相同，支持的数据
+    类型也相同。
+
+    Args:
+        obj: 要序列化的 Python 对象
+        writer: 提供 write(bytes) 方法的对象，如以二进制模式打开的文件
+
+    Raises:
+        ValueError: 当数据超出支持的范围时
+        TypeError: 当数据类型不支持时
+    """
+    out = bytearray()
+    _dump(obj, out, writer.write)
+    if out:
+        writer.write(bytes(out))
+
+
+def _dump(obj, out: bytearray, flush=None):
+    """
+    将一个 Python 对象序列化后追加到 out 末尾
+
+    使用显式的迭代器栈代替递归：容器写完头部后，把其子项的迭代器压栈，
+    迭代器耗尽后出栈，嵌套深度不受解释器递归深度限制。
+
+    int/str/list/dict 直接按类型分派；其余类型按 type(obj) 在 _ENCODERS 中
+    查找编码函数，子类按 _ENCODER_FALLBACKS 的顺序匹配一次，结果缓存到
+    _ENCODERS 中。编码函数返回子项迭代器（容器）或 None（标量）。
+
+    Args:
+        obj: 要序列化的 Python 对象
+        out: 输出缓冲区
+        flush: 可选的写出函数；给出时，每写下一个子项之前若 out 达到
+            _STREAM_CHUNK_SIZE，就把 out 的内容交给 flush 并清空 out
+
+    Raises:
+        ValueError: 当数据超出支持的范围或嵌套过深时
+        TypeError: 当数据类型不支持时
+    """
+    enc_int = _enc_int
+    enc_str = _enc_str
+    enc_key = _enc_key
+    enc_list = _enc_list
+    enc_dict = _enc_dict
+    encoders = _ENCODERS
+    stack = [iter((obj,))]
+    while stack:
+        items = stack[-1]
+        # 字典压入的是 items() 迭代器，逐对取出键和值；其余为子项迭代器
+        is_map = type(items) is _DICT_ITEMS
+        for item in items:
+            if flush is not None and len(out) >= _STREAM_CHUNK_SIZE:
+                flush(bytes(out))
+                del out[:]
+            if is_map:
+                key, item = item
+                if type(key) is str:
+                    enc_key(key, out)
+                else:
+                    _dump(key, out)  # 键不会是容器，不会产生递归
+
+            cls = type(item)
+            # 最常见的类型只需一次指针比较（type(True) 不是 int，bool 会走查表）
+            if cls is int:
+                enc_int(item, out)
+                continue
+            if cls is str:
+                enc_str(item, out)
+                continue
+            if cls is list:
+                if not item:  # 空列表即 fixlist(0)
+                    out.append(0x50)
+                    continue
+                children = enc_list(item, out)
+            elif cls is dict:
+                if not item:  # 空字典即 fixmap(0)
+                    out.append(0x70)
+                    continue
+                children = enc_dict(item, out)
             else:
-                raise ValueError("Integer too large for int128")
-
-    # 处理浮点数类型
-    elif isinstance(obj, float):
-        # 直接使用 float64 确保精度
-        return b"\x22" + struct.pack(">d", obj)
-
-    # 处理字符串类型
-    elif isinstance(obj, str):
-        utf8_bytes = obj.encode("utf-8")
-        length = len(utf8_bytes)
-
-        if length <= 15:  # fixstring
-            return bytes([0x30 + length]) + utf8_bytes
-        elif length <= 65535:  # string16
-            return b"\x41" + length.to_bytes(2, "big") + utf8_bytes
-        elif length <= 4294967295:  # string32
-            return b"\x42" + length.to_bytes(4, "big") + utf8_bytes
-        else:
-            raise ValueError("String too long")
-
-    # 处理列表类型
-    elif isinstance(obj, list):
-        length = len(obj)
-
-        # 防止过深的递归和过大的数据结构
-        if length > 1000000:  # 限制列表大小
-            raise ValueError(f"List too long: {length} items (max 1000000)")
-
-        if length <= 15:  # fixlist
-            result = bytes([0x50 + length])
-            for item in obj:
-                try:
-                    result += dump_poculum(item)
-                except RecursionError:
+                encoder = encoders.get(cls)
+                if encoder is None:
+                    encoder = _resolve_encoder(cls)
+                children = encoder(item, out)
+            if children is not None:
+                if len(stack) > _MAX_DEPTH:
                     raise ValueError(
-                        "Maximum recursion depth exceeded while serializing nested structure"
+                        "Maximum nesting depth exceeded while serializing "
+                        f"nested structure (max {_MAX_DEPTH})"
                     )
-            return result
-        elif length <= 65535:  # list16
-            result = b"\x61" + length.to_bytes(2, "big")
-            for item in obj:
-                try:
-                    result += dump_poculum(item)
-                except RecursionError:
-                    raise ValueError(
-                        "Maximum recursion depth exceeded while serializing nested structure"
-                    )
-            return result
-        elif length <= 4294967295:  # list32
-            result = b"\x62" + length.to_bytes(4, "big")
-            for item in obj:
-                try:
-                    result += dump_poculum(item)
-                except RecursionError:
-                    raise ValueError(
-                        "Maximum recursion depth exceeded while serializing nested structure"
-                    )
-            return result
-        else:
-            raise ValueError("List too long")
-
-    # 处理字典类型
-    elif isinstance(obj, dict):
-        length = len(obj)
-
-        # 防止过大的数据结构
-        if length > 1000000:  # 限制字典大小
-            raise ValueError(f"Map too long: {length} items (max 1000000)")
-
-        if length <= 15:  # fixmap
-            result = bytes([0x70 + length])
-            for key, value in obj.items():
-                try:
-                    result += dump_poculum(key)
-                    result += dump_poculum(value)
-                except RecursionError:
-                    raise ValueError(
-                        "Maximum recursion depth exceeded while serializing nested structure"
-                    )
-            return result
-        elif length <= 65535:  # map16
-            result = b"\x81" + length.to_bytes(2, "big")
-            for key, value in obj.items():
-                try:
-                    result += dump_poculum(key)
-                    result += dump_poculum(value)
-                except RecursionError:
-                    raise ValueError(
-                        "Maximum recursion depth exceeded while serializing nested structure"
-                    )
-            return result
-        elif length <= 4294967295:  # map32
-            result = b"\x82" + length.to_bytes(4, "big")
-            for key, value in obj.items():
-                try:
-                    result += dump_poculum(key)
-                    result += dump_poculum(value)
-                except RecursionError:
-                    raise ValueError(
-                        "Maximum recursion depth exceeded while serializing nested structure"
-                    )
-            return result
+                stack.append(children)
+                break
         else:
-            raise ValueError("Map too long")
-
-    # 处理字节类型
-    elif isinstance(obj, bytes):
-        length = len(obj)
-
-        if length <= 255:  # bytes8
-            return b"\x91" + bytes([length]) + obj
-        elif length <= 65535:  # bytes16
-            return b"\x92" + length.to_bytes(2, "big") + obj
-        elif length <= 4294967295:  # bytes32
-            return b"\x93" + length.to_bytes(4, "big") + obj
-        else:
-            raise ValueError("Bytes too long")
+            stack.pop()
+
+
+_DICT_ITEMS = type(iter({}.items()))
 
+# dump_poculum_into 每次写出的最小字节数
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _resolve_encoder(cls):
+    """为不在 _ENCODERS 中的类型（通常是受支持类型的子类）查找编码函数"""
+    for base, encoder in _ENCODER_FALLBACKS:
+        if issubclass(cls, base):
+            _ENCODERS[cls] = encoder
+            return encoder
+    raise TypeError(f"Unsupported type: {cls}")
+
+
+def _enc_none(obj, out: bytearray):
+    pass
+
+
+def _enc_bool(obj, out: bytearray):
+    if obj:
+        out += b"\x01\x01"  # True -> uint8(1)
+    else:
+        out += b"\x01\x00"  # False -> uint8(0)
+
+
+def _enc_int(obj, out: bytearray):
+    if obj >= 0:  # 无符号整数
+        bits = obj.bit_length()
+        if bits <= 8:  # uint8 最常见，直接写入单个字节
+            out.append(0x01)
+            out.append(obj)
+            return
+        if bits > 128:
+            raise ValueError("Integer too large for uint128")
+        type_byte, size = _UINT_WIDTHS[bits]
+        out.append(type_byte)
+        out += obj.to_bytes(size, "big")
+    else:  # 有符号整数，~obj 的位数加上符号位即为所需位数
+        bits = (~obj).bit_length() + 1
+        if bits > 128:
+            raise ValueError("Integer too large for int128")
+        type_byte, size = _INT_WIDTHS[bits]
+        out.append(type_byte)
+        out += obj.to_bytes(size, "big", signed=True)
+
+
+# 以所需位数 (0~128) 为下标的 (类型字节, 数据字节数) 表
+_UINT_WIDTHS = (
+    [(0x01, 1)] * 9  # uint8
+    + [(0x02, 2)] * 8  # uint16
+    + [(0x03, 4)] * 16  # uint32
+    + [(0x04, 8)] * 32  # uint64
+    + [(0x05, 16)] * 64  # uint128
+)
+_INT_WIDTHS = (
+    [(0x11, 1)] * 9  # int8
+    + [(0x12, 2)] * 8  # int16
+    + [(0x13, 4)] * 16  # int32
+    + [(0x14, 8)] * 32  # int64
+    + [(0x15, 16)] * 64  # int128
+)
+
+
+def _enc_float(obj, out: bytearray):
+    # 直接使用 float64 确保精度
+    out += _TAG_F64.pack(0x22, obj)
+
+
+def _enc_str(obj, out: bytearray):
+    utf8_bytes = obj.encode("utf-8")
+    length = len(utf8_bytes)
+
+    if length <= 15:  # fixstring
+        out.append(0x30 + length)
+    elif length <= 65535:  # string16
+        out += _TAG_U16.pack(0x41, length)
+    elif length <= 4294967295:  # string32
+        out += _TAG_U32.pack(0x42, length)
     else:
-        raise TypeError(f"Unsupported type: {type(obj)}")
+        raise ValueError("String too long")
+    out += utf8_bytes
+
+
+# 字典键（多为反复出现的短字符串）的完整编码缓存，写满后不再加入新键
+_KEY_CACHE = {}
+_KEY_CACHE_SIZE = 4096
+_KEY_CACHE_MAX_LEN = 64
+
+
+def _enc_key(obj, out: bytearray):
+    encoded = _KEY_CACHE.get(obj)
+    if encoded is not None:
+        out += encoded
+        return
+
+    start = len(out)
+    _enc_str(obj, out)
+    if len(obj) <= _KEY_CACHE_MAX_LEN and len(_KEY_CACHE) < _KEY_CACHE_SIZE:
+        _KEY_CACHE[obj] = bytes(out[start:])
+
 
+def _enc_list(obj, out: bytearray):
+    length = len(obj)
 
-def _get_item_size(box: bytes, offset: int = 0):
+    # 防止过大的数据结构
+    if length > 1000000:  # 限制列表大小
+        raise ValueError(f"List too long: {length} items (max 1000000)")
+
+    if length <= 15:  # fixlist
+        out.append(0x50 + length)
+    elif length <= 65535:  # list16
+        out += _TAG_U16.pack(0x61, length)
+    elif length <= 4294967295:  # list32
+        out += _TAG_U32.pack(0x62, length)
+    else:
+        raise ValueError("List too long")
+
+    if not length or (length >= _PACKED_INT_MIN and _enc_int_list(obj, out)):
+        return None
+    return iter(obj)
+
+
+# 元素数不少于该值的 int 列表才尝试批量编码，更短的列表逐个编码更快
+_PACKED_INT_MIN = 16
+
+# 与各整数宽度对应的 array 类型码，键为 (字节数, 是否有符号)
+_ARRAY_CODES = {}
+for _code in "bhilqBHILQ":
+    _ARRAY_CODES.setdefault((array.array(_code).itemsize, _code.islower()), _code)
+del _code
+
+# 以 bit_length() (0~64) 为下标的无符号整数类型字节，用于 bytes.translate
+_UINT_TAG_BY_BITS = bytes(_UINT_WIDTHS[bits][0] for bits in range(65)) + bytes(191)
+_UINT_SIZE_BY_TAG = dict(_UINT_WIDTHS[:65])
+_RUN_PATTERN = re.compile(rb"(.)\1*", re.DOTALL)
+
+
+def _enc_int_list(obj: list, out: bytearray) -> bool:
     """
-    计算从指定偏移量开始的一个项目占用的字节数
-    
-    Args:
-        box: 字节数据
-        offset: 起始偏移量
-        
+    批量编码元素全部为 int 的列表
+
+    连续的同宽度元素（如 list(range(1000)) 中的 uint8 段和 uint16 段）通过
+    array 一次性转换为大端字节，再与类型字节交错写入，输出与逐个编码完全相同。
+
     Returns:
-        该项目占用的字节数
-        
-    Raises:
-        IndexError: 当数据长度不足时
-        ValueError: 当遇到未知类型时
+        是否已写入全部元素；返回 False 时 out 未被修改，需按常规方式逐个编码
     """
-    if offset >= len(box):
-        raise IndexError("Offset exceeds data length")
-    
-    type_byte = box[offset]
-    
-    # uint8-uint128, int8-int128
-    if type_byte in [0x01, 0x11]:  # uint8, int8
-        return 2
-    elif type_byte in [0x02, 0x12]:  # uint16, int16
-        return 3
-    elif type_byte in [0x03, 0x13]:  # uint32, int32
-        return 5
-    elif type_byte in [0x04, 0x14]:  # uint64, int64
-        return 9
-    elif type_byte in [0x05, 0x15]:  # uint128, int128
-        return 17
-    
-    # float32, float64
-    elif type_byte == 0x21:  # float32
-        return 5
-    elif type_byte == 0x22:  # float64
-        return 9
-    
-    # fixstring
-    elif 0x30 <= type_byte <= 0x3F:
-        length = type_byte - 0x30
-        return 1 + length
-    
-    # string16
-    elif type_byte == 0x41:
-        if offset + 3 > len(box):
-            raise IndexError("Insufficient data for string16 length")
-        length = int.from_bytes(box[offset + 1:offset + 3], "big")
-        return 3 + length
-    
-    # string32
-    elif type_byte == 0x42:
-        if offset + 5 > len(box):
-            raise IndexError("Insufficient data for string32 length")
-        length = int.from_bytes(box[offset + 1:offset + 5], "big")
-        return 5 + length
-    
-    # fixlist
-    elif 0x50 <= type_byte <= 0x5F:
-        length = type_byte - 0x50
-        size = 1  # 类型字节
-        current_offset = offset + 1
-        for _ in range(length):
-            item_size = _get_item_size(box, current_offset)
-            size += item_size
-            current_offset += item_size
-        return size
-    
-    # list16
-    elif type_byte == 0x61:
-        if offset + 3 > len(box):
-            raise IndexError("Insufficient data for list16 length")
-        length = int.from_bytes(box[offset + 1:offset + 3], "big")
-        size = 3  # 类型字节 + 长度字节
-        current_offset = offset + 3
-        for _ in range(length):
-            item_size = _get_item_size(box, current_offset)
-            size += item_size
-            current_offset += item_size
-        return size
-    
-    # list32
-    elif type_byte == 0x62:
-        if offset + 5 > len(box):
-            raise IndexError("Insufficient data for list32 length")
-        length = int.from_bytes(box[offset + 1:offset + 5], "big")
-        size = 5  # 类型字节 + 长度字节
-        current_offset = offset + 5
-        for _ in range(length):
-            item_size = _get_item_size(box, current_offset)
-            size += item_size
-            current_offset += item_size
-        return size
-    
-    # fixmap
-    elif 0x70 <= type_byte <= 0x7F:
-        length = type_byte - 0x70
-        size = 1  # 类型字节
-        current_offset = offset + 1
-        for _ in range(length):
-            # 键
-            key_size = _get_item_size(box, current_offset)
-            size += key_size
-            current_offset += key_size
-            # 值
-            value_size = _get_item_size(box, current_offset)
-            size += value_size
-            current_offset += value_size
-        return size
-    
-    # map16
-    elif type_byte == 0x81:
-        if offset + 3 > len(box):
-            raise IndexError("Insufficient data for map16 length")
-        length = int.from_bytes(box[offset + 1:offset + 3], "big")
-        size = 3  # 类型字节 + 长度字节
-        current_offset = offset + 3
-        for _ in range(length):
-            # 键
-            key_size = _get_item_size(box, current_offset)
-            size += key_size
-            current_offset += key_size
-            # 值
-            value_size = _get_item_size(box, current_offset)
-            size += value_size
-            current_offset += value_size
-        return size
-    
-    # map32
-    elif type_byte == 0x82:
-        if offset + 5 > len(box):
-            raise IndexError("Insufficient data for map32 length")
-        length = int.from_bytes(box[offset + 1:offset + 5], "big")
-        size = 5  # 类型字节 + 长度字节
-        current_offset = offset + 5
-        for _ in range(length):
-            # 键
-            key_size = _get_item_size(box, current_offset)
-            size += key_size
-            current_offset += key_size
-            # 值
-            value_size = _get_item_size(box, current_offset)
-            size += value_size
-            current_offset += value_size
-        return size
-    
-    # bytes8
-    elif type_byte == 0x91:
-        if offset + 2 > len(box):
-            raise IndexError("Insufficient data for bytes8 length")
-        length = box[offset + 1]
-        return 2 + length
-    
-    # bytes16
-    elif type_byte == 0x92:
-        if offset + 3 > len(box):
-            raise IndexError("Insufficient data for bytes16 length")
-        length = int.from_bytes(box[offset + 1:offset + 3], "big")
-        return 3 + length
-    
-    # bytes32
-    elif type_byte == 0x93:
-        if offset + 5 > len(box):
-            raise IndexError("Insufficient data for bytes32 length")
-        length = int.from_bytes(box[offset + 1:offset + 5], "big")
-        return 5 + length
-    
-    else:
-        raise ValueError(f"Unknown type identifier: 0x{type_byte:02x}")
+    # 首个元素不是 int 的列表不必扫描全部元素的类型
+    if type(obj[0]) is not int or set(map(type, obj)) != {int}:
+        return False
 
+    low = min(obj)
+    if low >= 0:  # 无符号整数
+        try:
+            tags = bytes(map(int.bit_length, obj)).translate(_UINT_TAG_BY_BITS)
+        except ValueError:  # 存在超过 255 位的元素
+            return False
+        if 0 in tags:  # 存在超过 64 位的元素，交给逐个编码
+            return False
+        runs = [match.span() for match in _RUN_PATTERN.finditer(tags)]
+        # 宽度交替过于频繁时，分段的开销会超过逐个编码
+        if len(runs) > len(obj) // _PACKED_INT_MIN:
+            return False
+        for start, end in runs:
+            type_byte = tags[start]
+            _pack_int_run(
+                obj[start:end], type_byte, _UINT_SIZE_BY_TAG[type_byte], False, out
+            )
+        return True
+
+    high = max(obj)
+    if high < 0:  # 有符号整数，仅处理全部元素宽度相同的情况
+        bits = (~low).bit_length() + 1
+        if bits > 64 or _INT_WIDTHS[bits] != _INT_WIDTHS[(~high).bit_length() + 1]:
+            return False
+        type_byte, size = _INT_WIDTHS[bits]
+        _pack_int_run(obj, type_byte, size, True, out)
+        return True
+
+    return False
+
+
+def _pack_int_run(
+    items: list, type_byte: int, size: int, signed: bool, out: bytearray
+):
+    """将宽度相同的一组整数编码为 "类型字节 + 大端数据" 的序列写入 out"""
+    data = array.array(_ARRAY_CODES[size, signed], items)
+    if sys.byteorder == "little":
+        data.byteswap()
+    raw = data.tobytes()
+
+    count = len(items)
+    step = size + 1
+    buf = bytearray(step * count)
+    buf[::step] = bytes((type_byte,)) * count
+    for i in range(size):
+        buf[i + 1 :: step] = raw[i::size]
+    out += buf
+
+
+def _enc_dict(obj, out: bytearray):
+    length = len(obj)
+
+    # 防止过大的数据结构
+    if length > 1000000:  # 限制字典大小
+        raise ValueError(f"Map too long: {length} items (max 1000000)")
+
+    if length <= 15:  # fixmap
+        out.append(0x70 + length)
+    elif length <= 65535:  # map16
+        out += _TAG_U16.pack(0x81, length)
+    elif length <= 4294967295:  # map32
+        out += _TAG_U32.pack(0x82, length)
+    else:
+        raise ValueError("Map too long")
 
-def load_poculum(box: bytes):
+    if not length:
+        return None
+    # items() 迭代器在 CPython 中会复用键值元组，由 _dump 逐对编码
+    items = iter(obj.items())
+    if type(items) is not _DICT_ITEMS:  # 如 OrderedDict，按其顺序复制为普通字典
+        items = iter(dict(obj.items()).items())
+    return items
+
+
+def _enc_bytes(obj, out: bytearray):
+    length = len(obj)
+
+    if length <= 255:  # bytes8
+        out.append(0x91)
+        out.append(length)
+    elif length <= 65535:  # bytes16
+        out += _TAG_U16.pack(0x92, length)
+    elif length <= 4294967295:  # bytes32
+        out += _TAG_U32.pack(0x93, length)
+    else:
+        raise ValueError("Bytes too long")
+    out += obj
+
+
+# 按 type(obj) 精确查找的编码函数表
+_ENCODERS = {
+    type(None): _enc_none,
+    bool: _enc_bool,
+    int: _enc_int,
+    float: _enc_float,
+    str: _enc_str,
+    list: _enc_list,
+    dict: _enc_dict,
+    bytes: _enc_bytes,
+}
+
+# 子类的匹配顺序（bool 是 int 的子类，但 bool 不能再被继承，因此无需特殊处理）
+_ENCODER_FALLBACKS = (
+    (int, _enc_int),
+    (float, _enc_float),
+    (str, _enc_str),
+    (list, _enc_list),
+    (dict, _enc_dict),
+    (bytes, _enc_bytes),
+)
+
+
+def load_poculum(box):
     """
     将字节格式反序列化为 Python 对象
 
@@ -371,408 +424,555 @@ def load_poculum(box: bytes):
     - 字典类型: fixmap/map16/map32
     - 字节类型: bytes8/bytes16/bytes32
 
+    输入不小于 64KB 时，解析期间会暂停循环垃圾回收（gc.disable），
+    结束后恢复原来的状态，避免 GC 在大量创建容器时反复扫描整个堆。
+
     Args:
-        box: 要反序列化的字节数据
+        box: 要反序列化的字节数据（bytes、bytearray 或 memoryview）
 
     Returns:
         反序列化后的 Python 对象
 
     Raises:
-        ValueError: 当输入不是 bytes 类型时
+        ValueError: 当输入不是 bytes、bytearray 或 memoryview 类型时
         IndexError: 当数据长度不足时
         UnicodeDecodeError: 当字符串编码无效时
+        TypeError: 当字典的键是非空列表或字典时
     """
     if not box:
         return None
-    if not isinstance(box, bytes):
-        raise ValueError("Input must be of type bytes")
-
-    if len(box) < 1:
-        raise IndexError("Insufficient data: need at least 1 byte for type indicator")
-
-    type_byte = box[0]
-
-    # uint8:0~255
-    if type_byte == 0x01:
-        if len(box) < 2:
-            raise IndexError("Insufficient data for uint8: need 2 bytes")
-        return int.from_bytes(box[1:2], "big")
-
-    # uint16:0~65535
-    if type_byte == 0x02:
-        if len(box) < 3:
-            raise IndexError("Insufficient data for uint16: need 3 bytes")
-        return int.from_bytes(box[1:3], "big")
-
-    # uint32:0~4294967295
-    if type_byte == 0x03:
-        if len(box) < 5:
-            raise IndexError("Insufficient data for uint32: need 5 bytes")
-        return int.from_bytes(box[1:5], "big")
-
-    # uint64:0~18446744073709551615
-    if type_byte == 0x04:
-        if len(box) < 9:
-            raise IndexError("Insufficient data for uint64: need 9 bytes")
-        return int.from_bytes(box[1:9], "big")
-
-    # uint128:0~340282366920938463463374607431768211455
-    if type_byte == 0x05:
-        if len(box) < 17:
-            raise IndexError("Insufficient data for uint128: need 17 bytes")
-        return int.from_bytes(box[1:17], "big")
-
-    # int8: -128~127
-    if type_byte == 0x11:
-        if len(box) < 2:
-            raise IndexError("Insufficient data for int8: need 2 bytes")
-        return int.from_bytes(box[1:2], "big", signed=True)
-
-    # int16: -32768~32767
-    if type_byte == 0x12:
-        if len(box) < 3:
-            raise IndexError("Insufficient data for int16: need 3 bytes")
-        return int.from_bytes(box[1:3], "big", signed=True)
-
-    # int32: -2147483648~2147483647
-    if type_byte == 0x13:
-        if len(box) < 5:
-            raise IndexError("Insufficient data for int32: need 5 bytes")
-        return int.from_bytes(box[1:5], "big", signed=True)
-
-    # int64: -9223372036854775808~9223372036854775807
-    if type_byte == 0x14:
-        if len(box) < 9:
-            raise IndexError("Insufficient data for int64: need 9 bytes")
-        return int.from_bytes(box[1:9], "big", signed=True)
-
-    # int128: -170141183460469231731687303715884105728~170141183460469231731687303715884105727
-    if type_byte == 0x15:
-        if len(box) < 17:
-            raise IndexError("Insufficient data for int128: need 17 bytes")
-        return int.from_bytes(box[1:17], "big", signed=True)
+    # 输入只在这里校验一次；bytearray/memoryview 先转换为 bytes，内部的解码
+    # 函数只处理 bytes，解析出的字节类型数据也始终是 bytes
+    if type(box) is not bytes:
+        if not isinstance(box, (bytes, bytearray, memoryview)):
+            raise ValueError("Input must be of type bytes, bytearray or memoryview")
+        box = bytes(box)
 
-    # float32: -3.402823466e+38~3.402823466e+38
-    if type_byte == 0x21:
-        if len(box) < 5:
-            raise IndexError("Insufficient data for float32: need 5 bytes")
-        return struct.unpack(">f", box[1:5])[0]
+    if len(box) < _GC_PAUSE_MIN_SIZE:
+        obj, _ = _load(box, 0)
+        return obj
 
-    # float64: -1.7976931348623157e+308~1.7976931348623157e+308
-    if type_byte == 0x22:
-        if len(box) < 9:
-            raise IndexError("Insufficient data for float64: need 9 bytes")
-        return struct.unpack(">d", box[1:9])[0]
-
-    # fixstring：第一个字节的低位表示字符串的字节个数
-    if 0x30 <= type_byte <= 0x3F:
-        length = type_byte - 0x30
-        if len(box) < 1 + length:
-            raise IndexError(
-                f"Insufficient data for fixstring: need {1 + length} bytes, got {len(box)}"
-            )
-        try:
-            return box[1 : 1 + length].decode("utf-8")
-        except UnicodeDecodeError as e:
-            raise UnicodeDecodeError(
-                e.encoding,
-                e.object,
-                e.start,
-                e.end,
-                f"Invalid UTF-8 in fixstring: {e.reason}",
-            )
+    gc_enabled = gc.isenabled()
+    if gc_enabled:
+        gc.disable()
+    try:
+        obj, _ = _load(box, 0)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return obj
 
-    # string16: 1~65535 bytes
-    if type_byte == 0x41:
-        if len(box) < 3:
-            raise IndexError("Insufficient data for string16 length: need 3 bytes")
-        length = int.from_bytes(box[1:3], "big")
-        if len(box) < 3 + length:
-            raise IndexError(
-                f"Insufficient data for string16: need {3 + length} bytes, got {len(box)}"
-            )
-        try:
-            return box[3 : 3 + length].decode("utf-8")
-        except UnicodeDecodeError as e:
-            raise UnicodeDecodeError(
-                e.encoding,
-                e.object,
-                e.start,
-                e.end,
-                f"Invalid UTF-8 in string16: {e.reason}",
-            )
 
-    # String32: 1~4294967295 bytes
-    if type_byte == 0x42:
-        if len(box) < 5:
-            raise IndexError("Insufficient data for string32 length: need 5 bytes")
-        length = int.from_bytes(box[1:5], "big")
-        # 防止过大的长度声明导致内存耗尽
-        if length > len(box) - 5:
-            raise ValueError(
-                f"Invalid string32 length: declared {length}, available {len(box) - 5}"
-            )
-        if length > 100 * 1024 * 1024:  # 限制为100MB
-            raise ValueError(f"String32 length too large: {length} bytes (max 100MB)")
-        try:
-            return box[5 : 5 + length].decode("utf-8")
-        except UnicodeDecodeError as e:
-            raise UnicodeDecodeError(
-                e.encoding,
-                e.object,
-                e.start,
-                e.end,
-                f"Invalid UTF-8 in string32: {e.reason}",
-            )
+# 输入达到该字节数时，load_poculum 在解析期间暂停循环垃圾回收
+_GC_PAUSE_MIN_SIZE = 64 * 1024
 
-    # fixlist: 0~15 items，高位表示列表长度
-    if 0x50 <= type_byte <= 0x5F:
-        length = type_byte - 0x50
-        if length > 1000:  # 防止过大的列表导致性能问题
-            raise ValueError(f"Fixlist length too large: {length} items (max 1000)")
-        result = []
-        offset = 1
-        for i in range(length):
-            if offset >= len(box):
-                raise IndexError(
-                    f"Insufficient data for fixlist item {i}: reached end of data"
-                )
-            item_box = box[offset:]
-            try:
-                item = load_poculum(item_box)
-                result.append(item)
-                # 使用高效的方式计算已消耗的字节数
-                item_size = _get_item_size(box, offset)
-                offset += item_size
-            except RecursionError:
-                raise ValueError(
-                    "Maximum recursion depth exceeded while parsing nested structure"
-                )
-        return result
 
-    # list16: 1~65535 items
-    if type_byte == 0x61:
-        if len(box) < 3:
-            raise IndexError("Insufficient data for list16 length: need 3 bytes")
-        length = int.from_bytes(box[1:3], "big")
-        if length > 10000:  # 防止过大的列表
-            raise ValueError(f"List16 length too large: {length} items (max 10000)")
-        result = []
-        offset = 3
-        for i in range(length):
-            if offset >= len(box):
-                raise IndexError(
-                    f"Insufficient data for list16 item {i}: reached end of data"
-                )
-            item_box = box[offset:]
-            try:
-                item = load_poculum(item_box)
-                result.append(item)
-                item_size = _get_item_size(box, offset)
-                offset += item_size
-            except RecursionError:
-                raise ValueError(
-                    "Maximum recursion depth exceeded while parsing nested structure"
-                )
-        return result
+def _load(box: bytes, offset: int):
+    """
+    从指定偏移量开始解析一个项目
 
-    # list32: 1~4294967295 items
-    if type_byte == 0x62:
-        if len(box) < 5:
-            raise IndexError("Insufficient data for list32 length: need 5 bytes")
-        length = int.from_bytes(box[1:5], "big")
-        if length > 100000:  # 防止过大的列表
-            raise ValueError(f"List32 length too large: {length} items (max 100000)")
-        result = []
-        offset = 5
-        for i in range(length):
-            if offset >= len(box):
-                raise IndexError(
-                    f"Insufficient data for list32 item {i}: reached end of data"
-                )
-            item_box = box[offset:]
-            try:
-                item = load_poculum(item_box)
-                result.append(item)
-                item_size = _get_item_size(box, offset)
-                offset += item_size
-            except RecursionError:
-                raise ValueError(
-                    "Maximum recursion depth exceeded while parsing nested structure"
-                )
-        return result
-
-    # fixmap: 0~15 items，高位表示映射长度
-    if 0x70 <= type_byte <= 0x7F:
-        length = type_byte - 0x70
-        if length > 1000:  # 防止过大的字典
-            raise ValueError(f"Fixmap length too large: {length} items (max 1000)")
-        result = {}
-        offset = 1
-        for i in range(length):
-            if offset >= len(box):
-                raise IndexError(
-                    f"Insufficient data for fixmap key {i}: reached end of data"
-                )
+    按类型字节在 _DECODERS 中查找解码函数。标量的解码函数返回解析出的值；
+    容器的解码函数只解析头部，返回 (空容器, 子项个数, 类型名) 元组。
+    _load 用显式栈代替递归：在栈顶容器的循环中依次解析子项，遇到非空的
+    子容器时先放入父容器、再压栈填充，填满后出栈并从父容器的下一项继续。
+    每个子项只解析一次，嵌套深度不受解释器递归深度限制。
 
-            # 解析键
-            key_box = box[offset:]
-            try:
-                key = load_poculum(key_box)
-                key_size = _get_item_size(box, offset)
-                offset += key_size
-            except RecursionError:
-                raise ValueError(
-                    "Maximum recursion depth exceeded while parsing nested structure"
-                )
+    Args:
+        box: 完整的字节数据
+        offset: 该项目类型字节所在的偏移量
 
-            if offset >= len(box):
-                raise IndexError(
-                    f"Insufficient data for fixmap value {i}: reached end of data"
-                )
+    Returns:
+        (反序列化后的 Python 对象, 该项目之后的偏移量)
 
-            # 解析值
-            value_box = box[offset:]
-            try:
-                value = load_poculum(value_box)
-                value_size = _get_item_size(box, offset)
-                offset += value_size
-            except RecursionError:
-                raise ValueError(
-                    "Maximum recursion depth exceeded while parsing nested structure"
-                )
+    Raises:
+        IndexError: 当数据长度不足时
+        ValueError: 当遇到未知类型、长度无效或嵌套过深时
+        UnicodeDecodeError: 当字符串编码无效时
+        TypeError: 当字典的键是非空列表或字典时
+    """
+    decoders = _DECODERS
+    value, offset = decoders[box[offset]](box, offset)
+    if type(value) is not tuple:
+        return value, offset
+
+    root, length, kind = value
+    if not length:
+        return root, offset
+
+    end = len(box)
+    # 栈中每一项为 (容器, 剩余子项序号的迭代器, 类型名)
+    stack = [(root, iter(range(length)), kind)]
+    while stack:
+        result, indices, kind = stack[-1]
+
+        if type(result) is dict:
+            for i in indices:
+                if offset >= end:
+                    raise IndexError(
+                        f"Insufficient data for {kind} key {i}: reached end of data"
+                    )
+                key, offset = decoders[box[offset]](box, offset)
+                if type(key) is tuple:  # 非空列表和字典不可哈希，不能作为键
+                    raise TypeError(
+                        f"Unhashable {kind} key {i}: {type(key[0]).__name__}"
+                    )
 
-            result[key] = value
-        return result
+                if offset >= end:
+                    raise IndexError(
+                        f"Insufficient data for {kind} value {i}: reached end of data"
+                    )
+                value, offset = decoders[box[offset]](box, offset)
+                if type(value) is tuple:
+                    child, length, child_kind = value
+                    result[key] = child
+                    if length:  # 先填充子容器，完成后从下一项继续
+                        if len(stack) >= _MAX_DEPTH:
+                            raise ValueError(_DEPTH_ERROR)
+                        stack.append((child, iter(range(length)), child_kind))
+                        break
+                else:
+                    result[key] = value
+            else:
+                stack.pop()
+        else:
+            append = result.append
+            for i in indices:
+                if offset >= end:
+                    raise IndexError(
+                        f"Insufficient data for {kind} item {i}: reached end of data"
+                    )
+                value, offset = decoders[box[offset]](box, offset)
+                if type(value) is tuple:
+                    child, length, child_kind = value
+                    append(child)
+                    if length:  # 先填充子容器，完成后从下一项继续
+                        if len(stack) >= _MAX_DEPTH:
+                            raise ValueError(_DEPTH_ERROR)
+                        stack.append((child, iter(range(length)), child_kind))
+                        break
+                else:
+                    append(value)
+            else:
+                stack.pop()
 
-    # map16: 1~65535 items
-    if type_byte == 0x81:
-        if len(box) < 3:
-            raise IndexError("Insufficient data for map16 length: need 3 bytes")
-        length = int.from_bytes(box[1:3], "big")
-        if length > 10000:  # 防止过大的字典
-            raise ValueError(f"Map16 length too large: {length} items (max 10000)")
-        result = {}
-        offset = 3
-        for i in range(length):
-            if offset >= len(box):
-                raise IndexError(
-                    f"Insufficient data for map16 key {i}: reached end of data"
-                )
+    return root, offset
 
-            # 解析键
-            key_box = box[offset:]
-            try:
-                key = load_poculum(key_box)
-                key_size = _get_item_size(box, offset)
-                offset += key_size
-            except RecursionError:
-                raise ValueError(
-                    "Maximum recursion depth exceeded while parsing nested structure"
-                )
 
-            if offset >= len(box):
-                raise IndexError(
-                    f"Insufficient data for map16 value {i}: reached end of data"
-                )
+def load_poculum_from(reader):
+    """
+    从 reader 中读取并反序列化一个项目
 
-            # 解析值
-            value_box = box[offset:]
-            try:
-                value = load_poculum(value_box)
-                value_size = _get_item_size(box, offset)
-                offset += value_size
-            except RecursionError:
-                raise ValueError(
-                    "Maximum recursion depth exceeded while parsing nested structure"
-                )
+    按需调用 reader.read(n)，恰好读取一个完整项目所需的字节，之后 reader
+    停在该项目之后，可以继续读取下一个项目。read(n) 返回的数据不足 n 字节
+    时会继续读取，只有读到流末尾才视为数据不足，因此也可以直接使用非缓冲
+    的原始流。支持解析的格式、数据校验与
+    错误信息均与 load_poculum 相同。
 
-            result[key] = value
-        return result
+    Args:
+        reader: 提供 read(n) 方法的对象，如以二进制模式打开的文件
 
-    # map32: 1~4294967295 items
-    if type_byte == 0x82:
-        if len(box) < 5:
-            raise IndexError("Insufficient data for map32 length: need 5 bytes")
-        length = int.from_bytes(box[1:5], "big")
-        if length > 100000:  # 防止过大的字典
-            raise ValueError(f"Map32 length too large: {length} items (max 100000)")
-        result = {}
-        offset = 5
-        for i in range(length):
-            if offset >= len(box):
-                raise IndexError(
-                    f"Insufficient data for map32 key {i}: reached end of data"
-                )
+    Returns:
+        反序列化后的 Python 对象；reader 已无数据时返回 None
+
+    Raises:
+        IndexError: 当数据长度不足时
+        ValueError: 当遇到未知类型、长度无效或嵌套过深时
+        UnicodeDecodeError: 当字符串编码无效时
+        TypeError: 当字典的键是非空列表或字典时
+    """
+    read = reader.read
+    tag = read(1)
+    if not tag:
+        return None
+    return _load_from(read, tag)
 
-            # 解析键
-            key_box = box[offset:]
-            try:
-                key = load_poculum(key_box)
-                key_size = _get_item_size(box, offset)
-                offset += key_size
-            except RecursionError:
-                raise ValueError(
-                    "Maximum recursion depth exceeded while parsing nested structure"
-                )
 
-            if offset >= len(box):
+def _load_from(read, tag: bytes):
+    """
+    解析以类型字节 tag 开头的一个项目，其余数据通过 read(n) 读取
+
+    与 _load 的结构相同，只是每个项目的数据由 _read_value 从流中读出。
+    """
+    value = _read_value(read, tag)
+    if type(value) is not tuple:
+        return value
+
+    root, length, kind = value
+    if not length:
+        return root
+
+    stack = [(root, iter(range(length)), kind)]
+    while stack:
+        result, indices, kind = stack[-1]
+        is_map = type(result) is dict
+        for i in indices:
+            if is_map:
+                tag = read(1)
+                if not tag:
+                    raise IndexError(
+                        f"Insufficient data for {kind} key {i}: reached end of data"
+                    )
+                key = _read_value(read, tag)
+                if type(key) is tuple:  # 非空列表和字典不可哈希，不能作为键
+                    raise TypeError(
+                        f"Unhashable {kind} key {i}: {type(key[0]).__name__}"
+                    )
+
+            tag = read(1)
+            if not tag:
+                part = "value" if is_map else "item"
                 raise IndexError(
-                    f"Insufficient data for map32 value {i}: reached end of data"
+                    f"Insufficient data for {kind} {part} {i}: reached end of data"
                 )
+            value = _read_value(read, tag)
+            if type(value) is tuple:
+                child, length, child_kind = value
+            else:
+                child, length = value, 0
+            if is_map:
+                result[key] = child
+            else:
+                result.append(child)
+            if length:  # 先填充子容器，完成后从下一项继续
+                if len(stack) >= _MAX_DEPTH:
+                    raise ValueError(_DEPTH_ERROR)
+                stack.append((child, iter(range(length)), child_kind))
+                break
+        else:
+            stack.pop()
 
-            # 解析值
-            value_box = box[offset:]
-            try:
-                value = load_poculum(value_box)
-                value_size = _get_item_size(box, offset)
-                offset += value_size
-            except RecursionError:
-                raise ValueError(
-                    "Maximum recursion depth exceeded while parsing nested structure"
-                )
+    return root
 
-            result[key] = value
-        return result
 
-    # bytes8: 1~255 bytes
-    if type_byte == 0x91:
-        if len(box) < 2:
-            raise IndexError("Insufficient data for bytes8 length: need 2 bytes")
-        length = box[1]
-        if len(box) < 2 + length:
-            raise IndexError(
-                f"Insufficient data for bytes8: need {2 + length} bytes, got {len(box)}"
-            )
-        return box[2 : 2 + length]
+def _read_value(read, tag: bytes):
+    """
+    读出以类型字节 tag 开头的一个项目的全部数据，再交给 _DECODERS 解码
 
-    # bytes16: 1~65535 bytes
-    if type_byte == 0x92:
-        if len(box) < 3:
-            raise IndexError("Insufficient data for bytes16 length: need 3 bytes")
-        length = int.from_bytes(box[1:3], "big")
-        if len(box) < 3 + length:
+    先读取 _STREAM_HEAD_SIZES 给出的定长部分；字符串和字节类型再按长度
+    前缀读取数据部分。数据不足时由解码函数给出与 load_poculum 相同的错误。
+    返回值与解码函数相同：标量为解析出的值，容器为 (空容器, 子项个数, 类型名)。
+    """
+    type_byte = tag[0]
+    head = _STREAM_HEAD_SIZES[type_byte]
+    chunk = tag + _read_exactly(read, head) if head else tag
+    prefix = _STREAM_LENGTH_PREFIXES.get(type_byte)
+    if prefix is not None and len(chunk) == 1 + head:
+        length_of, limit, name = prefix
+        length = length_of.unpack_from(chunk, 1)[0]
+        # 在读取之前拒绝过大的长度声明，避免一次读入过多数据
+        if length > limit:
+            raise ValueError(f"{name} length too large: {length} bytes (max 100MB)")
+        chunk += _read_exactly(read, length)
+    return _DECODERS[type_byte](chunk, 0)[0]
+
+
+def _read_exactly(read, n: int) -> bytes:
+    """
+    读取 n 个字节，只有遇到流末尾时才返回更短的结果
+
+    非缓冲的原始流（如以 buffering=0 打开的管道）单次 read(n) 可能只返回
+    部分数据，此时继续读取剩余部分。
+    """
+    data = read(n)
+    if not data or len(data) == n:
+        return data or b""
+
+    parts = [data]
+    remaining = n - len(data)
+    while remaining:
+        data = read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b"".join(parts)
+
+
+_DEPTH_ERROR = (
+    f"Maximum nesting depth exceeded while parsing nested structure (max {_MAX_DEPTH})"
+)
+
+
+def _dec_unknown(box: bytes, offset: int):
+    # 未知类型标识符
+    raise ValueError(f"Unknown type identifier: 0x{box[offset]:02x}")
+
+
+def _make_int_decoder(name: str, size: int, signed: bool):
+    """生成定长整数的解码函数，size 为数据部分的字节数"""
+    need = 1 + size
+
+    if size > 8:  # 128 位整数没有对应的 struct 格式
+        def decoder(box: bytes, offset: int):
+            if len(box) - offset < need:
+                raise IndexError(f"Insufficient data for {name}: need {need} bytes")
+            end = offset + need
+            return int.from_bytes(box[offset + 1 : end], "big", signed=signed), end
+
+        return decoder
+
+    code = {1: "b", 2: "h", 4: "i", 8: "q"}[size]
+    unpack_from = struct.Struct(">" + (code if signed else code.upper())).unpack_from
+
+    def decoder(box: bytes, offset: int):
+        if len(box) - offset < need:
+            raise IndexError(f"Insufficient data for {name}: need {need} bytes")
+        return unpack_from(box, offset + 1)[0], offset + need
+
+    return decoder
+
+
+def _dec_uint8(box: bytes, offset: int):
+    # uint8:0~255，直接读取单个字节
+    if len(box) - offset < 2:
+        raise IndexError("Insufficient data for uint8: need 2 bytes")
+    return box[offset + 1], offset + 2
+
+
+def _dec_float32(box: bytes, offset: int):
+    # float32: -3.402823466e+38~3.402823466e+38
+    if len(box) - offset < 5:
+        raise IndexError("Insufficient data for float32: need 5 bytes")
+    return _F32.unpack_from(box, offset + 1)[0], offset + 5
+
+
+def _dec_float64(box: bytes, offset: int):
+    # float64: -1.7976931348623157e+308~1.7976931348623157e+308
+    if len(box) - offset < 9:
+        raise IndexError("Insufficient data for float64: need 9 bytes")
+    return _F64.unpack_from(box, offset + 1)[0], offset + 9
+
+
+def _decode_utf8(box, start: int, length: int, kind: str):
+    """解码 box[start:start+length] 为字符串，返回 (字符串, 新偏移量)
+
+    box 可以是 bytes 或 memoryview。
+    """
+    end = start + length
+    try:
+        return str(box[start:end], "utf-8"), end
+    except UnicodeDecodeError as e:
+        raise UnicodeDecodeError(
+            e.encoding,
+            e.object,
+            e.start,
+            e.end,
+            f"Invalid UTF-8 in {kind}: {e.reason}",
+        )
+
+
+def _make_fixstring_decoder(length: int):
+    """生成某一固定长度 fixstring 的解码函数，长度由类型字节的低 4 位给出"""
+    need = 1 + length
+
+    def decoder(box: bytes, offset: int):
+        end = offset + need
+        if end > len(box):
             raise IndexError(
-                f"Insufficient data for bytes16: need {3 + length} bytes, got {len(box)}"
+                f"Insufficient data for fixstring: need {need} bytes, "
+                f"got {len(box) - offset}"
             )
-        return box[3 : 3 + length]
+        try:
+            return box[offset + 1 : end].decode("utf-8"), end
+        except UnicodeDecodeError:  # 由 _decode_utf8 统一重新解码并给出错误信息
+            return _decode_utf8(box, offset + 1, length, "fixstring")
 
-    # bytes32: 1~4294967295 bytes
-    if type_byte == 0x93:
-        if len(box) < 5:
-            raise IndexError("Insufficient data for bytes32 length: need 5 bytes")
-        length = int.from_bytes(box[1:5], "big")
-        # 防止过大的长度声明导致内存耗尽
-        if length > len(box) - 5:
-            raise ValueError(
-                f"Invalid bytes32 length: declared {length}, available {len(box) - 5}"
-            )
-        if length > 100 * 1024 * 1024:  # 限制为100MB
-            raise ValueError(f"Bytes32 length too large: {length} bytes (max 100MB)")
-        return box[5 : 5 + length]
+    return decoder
+
+
+def _dec_string16(box: bytes, offset: int):
+    # string16: 1~65535 bytes
+    available = len(box) - offset
+    if available < 3:
+        raise IndexError("Insufficient data for string16 length: need 3 bytes")
+    length = _U16.unpack_from(box, offset + 1)[0]
+    if available < 3 + length:
+        raise IndexError(
+            f"Insufficient data for string16: need {3 + length} bytes, got {available}"
+        )
+    return _decode_utf8(box, offset + 3, length, "string16")
+
+
+def _dec_string32(box: bytes, offset: int):
+    # String32: 1~4294967295 bytes
+    available = len(box) - offset
+    if available < 5:
+        raise IndexError("Insufficient data for string32 length: need 5 bytes")
+    length = _U32.unpack_from(box, offset + 1)[0]
+    # 防止过大的长度声明导致内存耗尽
+    if length > available - 5:
+        raise ValueError(
+            f"Invalid string32 length: declared {length}, available {available - 5}"
+        )
+    if length > 100 * 1024 * 1024:  # 限制为100MB
+        raise ValueError(f"String32 length too large: {length} bytes (max 100MB)")
+    # string32 至少 64KB，通过 memoryview 解码可省去一次整段拷贝；
+    # 较短的字符串直接切片解码反而更快
+    with memoryview(box) as view:
+        return _decode_utf8(view, offset + 5, length, "string32")
+
+
+def _dec_fixlist(box: bytes, offset: int):
+    # fixlist: 0~15 items，低 4 位表示列表长度
+    length = box[offset] & 0x0F
+    return ([], length, "fixlist"), offset + 1
+
+
+def _dec_empty_list(box: bytes, offset: int):
+    # fixlist(0)：直接返回空列表，无需经过 _load 的容器填充流程
+    return [], offset + 1
+
+
+def _dec_list16(box: bytes, offset: int):
+    # list16: 1~65535 items
+    if len(box) - offset < 3:
+        raise IndexError("Insufficient data for list16 length: need 3 bytes")
+    length = _U16.unpack_from(box, offset + 1)[0]
+    if length > 10000:  # 防止过大的列表
+        raise ValueError(f"List16 length too large: {length} items (max 10000)")
+    return ([], length, "list16"), offset + 3
+
+
+def _dec_list32(box: bytes, offset: int):
+    # list32: 1~4294967295 items
+    if len(box) - offset < 5:
+        raise IndexError("Insufficient data for list32 length: need 5 bytes")
+    length = _U32.unpack_from(box, offset + 1)[0]
+    if length > 100000:  # 防止过大的列表
+        raise ValueError(f"List32 length too large: {length} items (max 100000)")
+    return ([], length, "list32"), offset + 5
+
+
+def _dec_fixmap(box: bytes, offset: int):
+    # fixmap: 0~15 items，低 4 位表示映射长度
+    length = box[offset] & 0x0F
+    return ({}, length, "fixmap"), offset + 1
 
-    # 未知类型标识符
-    raise ValueError(f"Unknown type identifier: 0x{type_byte:02x}")
+
+def _dec_empty_map(box: bytes, offset: int):
+    # fixmap(0)：直接返回空字典
+    return {}, offset + 1
+
+
+def _dec_map16(box: bytes, offset: int):
+    # map16: 1~65535 items
+    if len(box) - offset < 3:
+        raise IndexError("Insufficient data for map16 length: need 3 bytes")
+    length = _U16.unpack_from(box, offset + 1)[0]
+    if length > 10000:  # 防止过大的字典
+        raise ValueError(f"Map16 length too large: {length} items (max 10000)")
+    return ({}, length, "map16"), offset + 3
+
+
+def _dec_map32(box: bytes, offset: int):
+    # map32: 1~4294967295 items
+    if len(box) - offset < 5:
+        raise IndexError("Insufficient data for map32 length: need 5 bytes")
+    length = _U32.unpack_from(box, offset + 1)[0]
+    if length > 100000:  # 防止过大的字典
+        raise ValueError(f"Map32 length too large: {length} items (max 100000)")
+    return ({}, length, "map32"), offset + 5
+
+
+def _dec_bytes8(box: bytes, offset: int):
+    # bytes8: 1~255 bytes
+    available = len(box) - offset
+    if available < 2:
+        raise IndexError("Insufficient data for bytes8 length: need 2 bytes")
+    length = box[offset + 1]
+    if available < 2 + length:
+        raise IndexError(
+            f"Insufficient data for bytes8: need {2 + length} bytes, got {available}"
+        )
+    start = offset + 2
+    return box[start : start + length], start + length
+
+
+def _dec_bytes16(box: bytes, offset: int):
+    # bytes16: 1~65535 bytes
+    available = len(box) - offset
+    if available < 3:
+        raise IndexError("Insufficient data for bytes16 length: need 3 bytes")
+    length = _U16.unpack_from(box, offset + 1)[0]
+    if available < 3 + length:
+        raise IndexError(
+            f"Insufficient data for bytes16: need {3 + length} bytes, got {available}"
+        )
+    start = offset + 3
+    return box[start : start + length], start + length
+
+
+def _dec_bytes32(box: bytes, offset: int):
+    # bytes32: 1~4294967295 bytes
+    available = len(box) - offset
+    if available < 5:
+        raise IndexError("Insufficient data for bytes32 length: need 5 bytes")
+    length = _U32.unpack_from(box, offset + 1)[0]
+    # 防止过大的长度声明导致内存耗尽
+    if length > available - 5:
+        raise ValueError(
+            f"Invalid bytes32 length: declared {length}, available {available - 5}"
+        )
+    if length > 100 * 1024 * 1024:  # 限制为100MB
+        raise ValueError(f"Bytes32 length too large: {length} bytes (max 100MB)")
+    start = offset + 5
+    return box[start : start + length], start + length
+
+
+# 以类型字节为下标的解码函数表
+_DECODERS = [_dec_unknown] * 256
+_DECODERS[0x01] = _dec_uint8
+_DECODERS[0x02] = _make_int_decoder("uint16", 2, False)  # 0~65535
+_DECODERS[0x03] = _make_int_decoder("uint32", 4, False)  # 0~4294967295
+_DECODERS[0x04] = _make_int_decoder("uint64", 8, False)
+_DECODERS[0x05] = _make_int_decoder("uint128", 16, False)
+_DECODERS[0x11] = _make_int_decoder("int8", 1, True)  # -128~127
+_DECODERS[0x12] = _make_int_decoder("int16", 2, True)  # -32768~32767
+_DECODERS[0x13] = _make_int_decoder("int32", 4, True)
+_DECODERS[0x14] = _make_int_decoder("int64", 8, True)
+_DECODERS[0x15] = _make_int_decoder("int128", 16, True)
+_DECODERS[0x21] = _dec_float32
+_DECODERS[0x22] = _dec_float64
+for _type_byte in range(0x30, 0x40):
+    _DECODERS[_type_byte] = _make_fixstring_decoder(_type_byte & 0x0F)
+_DECODERS[0x41] = _dec_string16
+_DECODERS[0x42] = _dec_string32
+_DECODERS[0x50] = _dec_empty_list
+for _type_byte in range(0x51, 0x60):
+    _DECODERS[_type_byte] = _dec_fixlist
+_DECODERS[0x61] = _dec_list16
+_DECODERS[0x62] = _dec_list32
+_DECODERS[0x70] = _dec_empty_map
+for _type_byte in range(0x71, 0x80):
+    _DECODERS[_type_byte] = _dec_fixmap
+_DECODERS[0x81] = _dec_map16
+_DECODERS[0x82] = _dec_map32
+_DECODERS[0x91] = _dec_bytes8
+_DECODERS[0x92] = _dec_bytes16
+_DECODERS[0x93] = _dec_bytes32
+
+# load_poculum_from 使用：类型字节之后定长部分的字节数（不含字符串和字节类型的数据部分）
+_STREAM_HEAD_SIZES = [0] * 256
+for _size, _type_bytes in {
+    1: (0x01, 0x11, 0x91),  # uint8/int8, bytes8 长度
+    2: (0x02, 0x12, 0x41, 0x61, 0x81, 0x92),  # 16 位整数及 16 位长度
+    4: (0x03, 0x13, 0x21, 0x42, 0x62, 0x82, 0x93),  # 32 位整数、float32 及 32 位长度
+    8: (0x04, 0x14, 0x22),  # 64 位整数、float64
+    16: (0x05, 0x15),  # 128 位整数
+}.items():
+    for _type_byte in _type_bytes:
+        _STREAM_HEAD_SIZES[_type_byte] = _size
+for _type_byte in range(0x30, 0x40):
+    _STREAM_HEAD_SIZES[_type_byte] = _type_byte & 0x0F
+# 字符串和字节类型的长度前缀：(前缀格式, 允许的最大长度, 类型名)
+_STREAM_LENGTH_PREFIXES = {
+    0x41: (_U16, 0xFFFF, "String16"),
+    0x42: (_U32, 100 * 1024 * 1024, "String32"),
+    0x91: (struct.Struct(">B"), 0xFF, "Bytes8"),
+    0x92: (_U16, 0xFFFF, "Bytes16"),
+    0x93: (_U32, 100 * 1024 * 1024, "Bytes32"),
+}
+del _type_byte, _type_bytes, _size
 
 
 # 测试函数
@@ -795,6 +995,11 @@ def test_poculum():
         # 列表测试
         [1, 2, 3],  # fixlist
         [1, "hello", 3.14],  # 混合类型列表
+        list(range(1000)),  # list16，批量编码：uint8 段后接 uint16 段
+        [-200] * 20,  # 批量编码：有符号整数
+        [2**64 - 1] * 20,  # 批量编码：uint64 上限
+        [2**70] * 20,  # 超过 64 位，逐个编码
+        [1] * 15 + [True],  # 含 bool，逐个编码
         # 字典测试
         {"key": "value"},  # fixmap
         {"a": 1, "b": 2, "c": 3},  # fixmap
@@ -823,6 +1028,65 @@ def test_poculum():
             print(f"Test {i+1} FAILED: {e}")
             print()
 
+    # 深度嵌套：超过解释器递归深度限制的嵌套也能往返
+    try:
+        deep = []
+        for _ in range(5000):
+            deep = [deep]
+        deserialized = load_poculum(dump_poculum(deep))
+        depth = 0
+        while deserialized:  # 逐层展开比较，避免 == 递归过深
+            deserialized = deserialized[0]
+            depth += 1
+        if depth == 5000 and deserialized == []:
+            print("Deep nesting test: ✓ PASS")
+        else:
+            print(f"Deep nesting test: ✗ FAIL: depth {depth} != 5000")
+        print()
+
+    except Exception as e:
+        print(f"Deep nesting test FAILED: {e}")
+        print()
+
+    # 循环引用：超过 _MAX_DEPTH 时抛出 ValueError
+    cyclic = []
+    cyclic.append(cyclic)
+    try:
+        dump_poculum(cyclic)
+        print("Cyclic reference test: ✗ FAIL: no error raised")
+    except ValueError as e:
+        print(f"Cyclic reference test: ✓ PASS ({e})")
+    except Exception as e:
+        print(f"Cyclic reference test FAILED: {type(e).__name__}: {e}")
+    print()
+
+    # 字典的键为非空列表：解析到该键时立即抛出 TypeError
+    try:
+        load_poculum(b"\x71\x52\x01\x01\x01\x02\x01\x03")  # {[1, 2]: 3}
+        print("Unhashable key test: ✗ FAIL: no error raised")
+    except TypeError as e:
+        print(f"Unhashable key test: ✓ PASS ({e})")
+    except Exception as e:
+        print(f"Unhashable key test FAILED: {type(e).__name__}: {e}")
+    print()
+
+    # 流式读写：依次写入所有测试用例，再从同一个流中逐个读回
+    try:
+        stream = io.BytesIO()
+        for original in test_cases:
+            dump_poculum_into(original, stream)
+        stream.seek(0)
+        deserialized = [load_poculum_from(stream) for _ in test_cases]
+        if deserialized == test_cases and load_poculum_from(stream) is None:
+            print("Stream test: ✓ PASS")
+        else:
+            print(f"Stream test: ✗ FAIL: {test_cases} != {deserialized}")
+        print()
+
+    except Exception as e:
+        print(f"Stream test FAILED: {e}")
+        print()
+
 def test_size_reduction():
     import time
     import json